@@ -3,28 +3,52 @@ Helper utilities for creating and managing an AWS AppSync GraphQL API.
 Used in the GHC25 'Modeling a GraphQL Service on AWS' workshop.
 """
 
-import boto3, time, pathlib
+import boto3, concurrent.futures, functools, mmap, time
+from botocore.config import Config
 from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
 
 
 # ---------- Core client ----------
+_CLIENT_CONFIG = Config(max_pool_connections=32, retries={"max_attempts": 10, "mode": "adaptive"})
+
 def appsync_client(region: str):
     """Return a boto3 AppSync client for the given AWS region."""
-    return boto3.client("appsync", region_name=region)
+    return boto3.client("appsync", region_name=region, config=_CLIENT_CONFIG)
+
+
+# ---------- Parallel setup ----------
+def ensure_many(specs, max_workers=8):
+    """
+    Run independent setup steps concurrently, e.g. a wave of data-source or
+    function creations. Each AppSync call is a full round-trip, so running a
+    wave in parallel collapses N serial RTTs into roughly one.
+
+    specs: iterable of (callable, *args) tuples, e.g.
+        [(ensure_ddb_ds, client, api_id, "CatalogDS", table_arn, role_arn),
+         (ensure_none_ds, client, api_id)]
+    Steps within one wave must not depend on each other's results.
+    Returns results in spec order.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = [ex.submit(spec[0], *spec[1:]) for spec in specs]
+        return [f.result() for f in futures]
 
 
 # ---------- API creation ----------
+_api_cache: dict[str, dict] = {}  # name -> api, filled by find_api_by_name / ensure_api
+
 def find_api_by_name(client, name: str):
     """Find an AppSync API by its name (returns dict or None)."""
-    token = None
-    while True:
-        resp = client.list_graphql_apis(nextToken=token) if token else client.list_graphql_apis()
-        for api in resp.get("graphqlApis", []):
+    if name in _api_cache:
+        return _api_cache[name]
+    # list_graphql_apis has no server-side name filter; paginate and stop at the first hit.
+    for page in client.get_paginator("list_graphql_apis").paginate(PaginationConfig={"PageSize": 25}):
+        for api in page.get("graphqlApis", []):
             if api["name"] == name:
+                _api_cache[name] = api
                 return api
-        token = resp.get("nextToken")
-        if not token:
-            return None
+    return None
 
 
 def ensure_api(client, name: str, cloudwatch_logs_role_arn: str | None = None, enable_xray: bool = False):
@@ -50,22 +74,30 @@ def ensure_api(client, name: str, cloudwatch_logs_role_arn: str | None = None, e
             "fieldLogLevel": "ERROR",
         }
 
-    return client.create_graphql_api(**kwargs)["graphqlApi"]
+    api = client.create_graphql_api(**kwargs)["graphqlApi"]
+    _api_cache[name] = api
+    return api
 
 
 # ---------- Schema ----------
 def upload_schema(client, api_id: str, schema_path: str):
     """Upload a .graphql schema to AppSync and wait for compilation."""
-    data = pathlib.Path(schema_path).read_bytes()
-    client.start_schema_creation(apiId=api_id, definition=data)
-    for _ in range(30):
+    # mmap instead of read_bytes: no full heap copy of the schema, and the OS page-caches the file.
+    with open(schema_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        client.start_schema_creation(apiId=api_id, definition=mm)
+    # Poll with exponential backoff; most schemas compile in well under a second.
+    deadline = time.monotonic() + 60
+    delay = 0.25
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 1.5, 4.0)
         st = client.get_schema_creation_status(apiId=api_id)
         status, details = st.get("status"), st.get("details", "")
         if status in ("SUCCESS", "FAILED", "NOT_APPLICABLE"):
             if status != "SUCCESS":
                 raise RuntimeError(f"Schema status={status}: {details[:400]}")
             return
-        time.sleep(2)
+    raise RuntimeError("Timed out waiting for schema creation")
 
 
 # ---------- API key ----------
@@ -82,55 +114,98 @@ def ensure_api_key(client, api_id: str, days=1):
 
 
 # ---------- Data sources ----------
-def ensure_ddb_ds(client, api_id: str, name: str, table_arn: str, role_arn: str):
+class DataSourceIndex:
+    """
+    Name -> data source lookup built from one paginated list_data_sources call.
+
+    Build one per api_id and pass it to the ensure_*_ds helpers so creating
+    several data sources costs a single listing instead of one per helper.
+    """
+    def __init__(self, client, api_id: str):
+        self._by_name = {}
+        for page in client.get_paginator("list_data_sources").paginate(apiId=api_id):
+            for d in page.get("dataSources", []):
+                self._by_name[d["name"]] = d
+
+    def get(self, name: str):
+        return self._by_name.get(name)
+
+    def add(self, ds):
+        self._by_name[ds["name"]] = ds
+        return ds
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_table_arn(table_arn: str):
+    """Split a table ARN once into (table_name, region)."""
+    # arn:aws:dynamodb:<region>:<account>:table/<name>
+    _, _, _, region, _, resource = table_arn.split(":", 5)
+    return resource.split("/")[-1], region
+
+
+def ensure_ddb_ds(client, api_id: str, name: str, table_arn: str, role_arn: str, index: DataSourceIndex | None = None):
     """Create or reuse a DynamoDB data source."""
-    ds = client.list_data_sources(apiId=api_id).get("dataSources", [])
-    for d in ds:
-        if d["name"] == name:
-            return d
-    return client.create_data_source(
+    if index is None:
+        index = DataSourceIndex(client, api_id)
+    existing = index.get(name)
+    if existing:
+        return existing
+    table_name, table_region = _parse_table_arn(table_arn)
+    return index.add(client.create_data_source(
         apiId=api_id,
         name=name,
         type="AMAZON_DYNAMODB",
         serviceRoleArn=role_arn,
         dynamodbConfig={
-            "tableName": table_arn.split("/")[-1],
-            "awsRegion": table_arn.split(":")[3],
+            "tableName": table_name,
+            "awsRegion": table_region,
             "useCallerCredentials": False,
         },
-    )["dataSource"]
+    )["dataSource"])
 
 
-def ensure_none_ds(client, api_id: str, name="NoneDS"):
+def ensure_none_ds(client, api_id: str, name="NoneDS", index: DataSourceIndex | None = None):
     """Create or reuse a NONE data source (used for synthetic resolvers)."""
-    ds = client.list_data_sources(apiId=api_id).get("dataSources", [])
-    for d in ds:
-        if d["name"] == name:
-            return d
-    return client.create_data_source(apiId=api_id, name=name, type="NONE")["dataSource"]
+    if index is None:
+        index = DataSourceIndex(client, api_id)
+    existing = index.get(name)
+    if existing:
+        return existing
+    return index.add(client.create_data_source(apiId=api_id, name=name, type="NONE")["dataSource"])
 
 
 # ---------- JS resolvers ----------
+_resolver_fields: dict[tuple[str, str], set] = {}  # (api_id, type_name) -> {fieldName}
+
+def _existing_resolver_fields(client, api_id: str, type_name: str):
+    """List resolver field names once per (api_id, type) and cache them."""
+    key = (api_id, type_name)
+    if key not in _resolver_fields:
+        fields = set()
+        for page in client.get_paginator("list_resolvers").paginate(apiId=api_id, typeName=type_name):
+            for r in page.get("resolvers", []):
+                fields.add(r["fieldName"])
+        _resolver_fields[key] = fields
+    return _resolver_fields[key]
+
+
 def upsert_js_resolver(client, api_id: str, type_name: str, field: str, ds_name: str, js_code: str):
     """Create or update a JavaScript resolver for the specified field."""
-    try:
-        client.update_resolver(
-            apiId=api_id,
-            typeName=type_name,
-            fieldName=field,
-            dataSourceName=ds_name,
-            runtime={"name": "APPSYNC_JS", "runtimeVersion": "1.0.0"},
-            code=js_code,
-        )
-    except client.exceptions.NotFoundException:
-        client.create_resolver(
-            apiId=api_id,
-            typeName=type_name,
-            fieldName=field,
-            dataSourceName=ds_name,
-            runtime={"name": "APPSYNC_JS", "runtimeVersion": "1.0.0"},
-            code=js_code,
-        )
+    kwargs = dict(
+        apiId=api_id,
+        typeName=type_name,
+        fieldName=field,
+        dataSourceName=ds_name,
+        runtime={"name": "APPSYNC_JS", "runtimeVersion": "1.0.0"},
+        code=js_code,
+    )
+    # Branch on a cached listing instead of paying a failed UPDATE round-trip first.
+    fields = _existing_resolver_fields(client, api_id, type_name)
+    if field in fields:
+        client.update_resolver(**kwargs)
+    else:
+        client.create_resolver(**kwargs)
+        fields.add(field)
 
 # ---------- Get DDB Query Resolver JS for Cost ---------
 def get_ddb_query_resolver_js_code():
@@ -164,6 +239,62 @@ export function response(ctx) {
 }
 """
 
+# ---------- Get DDB BatchGetItem Resolver JS for Cost ---------
+def get_ddb_batch_cost_resolver_js_code(cost_table_name):
+    """
+    Return JavaScript code for a batched cost lookup.
+
+    Wire this as a pipeline stage after a catalog list resolver: instead of
+    one GetItem per parent product (the N+1 pattern), it coalesces all
+    parents into a single BatchGetItem (<=100 keys), deduplicating repeated
+    keys DataLoader-style.
+    """
+    return f"""
+export function request(ctx) {{
+  const products = ctx.prev.result?.items ?? [];
+  const vendorId = ctx.args?.vendorId;
+
+  if (!vendorId) {{
+    util.error("Missing vendorId argument", "BadRequest");
+  }}
+  if (products.length === 0) {{
+    return runtime.earlyReturn([]);
+  }}
+
+  // Dedupe keys so repeated parents cost a single read.
+  const seen = {{}};
+  const keys = [];
+  for (const p of products) {{
+    const asinVendor = `${{p.asin}}#${{vendorId}}`;
+    if (!seen[asinVendor]) {{
+      seen[asinVendor] = true;
+      keys.push(util.dynamodb.toMapValues({{ asinVendor }}));
+    }}
+  }}
+
+  return {{
+    operation: "BatchGetItem",
+    tables: {{
+      "{cost_table_name}": {{ keys }}
+    }}
+  }};
+}}
+
+export function response(ctx) {{
+  if (ctx.error) {{
+    util.error(ctx.error.message, ctx.error.type);
+  }}
+
+  const byKey = {{}};
+  for (const row of ctx.result.data?.["{cost_table_name}"] ?? []) {{
+    if (row) byKey[row.asinVendor] = row;
+  }}
+
+  const products = ctx.prev.result?.items ?? [];
+  return products.map(p => byKey[`${{p.asin}}#${{ctx.args.vendorId}}`] ?? null);
+}}
+"""
+
 # ---------- Get DDB Mutation Resolver JS for Cost ---------
 def get_ddb_mutation_resolver_js_code():
     """Return JavaScript code for DynamoDB cost mutation resolver."""
@@ -201,8 +332,12 @@ export function response(ctx) {
 """
 
 # ---------- Get SNS Mutation Resolver JS for Cost ---------
+@functools.lru_cache(maxsize=32)
 def get_sns_mutation_resolver_js_code(topic_arn):
     """Return JavaScript code for SNS cost mutation resolver."""
+    # Static form fields are URL-encoded here, once, at template-build time;
+    # the resolver then only encodes the per-request message.
+    body_prefix = f"Action=Publish&Version=2010-03-31&TopicArn={quote(topic_arn, safe='')}&Message="
     return f"""
 export function request(ctx) {{
   const asin = ctx.args.asin;
@@ -212,7 +347,6 @@ export function request(ctx) {{
     util.error("Missing asin or costData in SNS function", "BadRequest");
   }}
 
-  const arn = util.urlEncode("{topic_arn}");
   const message = util.urlEncode(JSON.stringify({{
     event: "cost_updated",
     asin: asin,
@@ -221,15 +355,8 @@ export function request(ctx) {{
     currency: costData.currency,
     timestamp: util.time.nowISO8601()
   }}));
-  
-  const parts = [
-    'Action=Publish',
-    'Version=2010-03-31',
-    `TopicArn=${{arn}}`,
-    `Message=${{message}}`
-  ]
-  
-  const body = parts.join('&');
+
+  const body = "{body_prefix}" + message;
   return {{
     version: "2018-05-29",
     method: "POST",
@@ -252,3 +379,68 @@ export function response(ctx) {{
   return ctx.prev.result;
 }}
 """
+
+# ---------- Get EventBridge Mutation Resolver JS for Cost ---------
+@functools.lru_cache(maxsize=32)
+def get_eventbridge_mutation_resolver_js_code(event_bus_name):
+    """
+    Return JavaScript code for an EventBridge cost mutation resolver.
+
+    Batching alternative to the SNS resolver: PutEvents accepts up to 10
+    entries per call, so a batch mutation that stashes its updates in
+    ctx.prev.result.batch emits one request instead of one per row. Pair with
+    ensure_eventbridge_ds from helpers_pipeline_resolvers.
+    """
+    return f"""
+export function request(ctx) {{
+  // Single mutations publish one entry; batch mutations stash up to 10.
+  let updates = ctx.prev.result?.batch;
+  if (!updates) {{
+    const asin = ctx.args.asin;
+    const costData = ctx.stash.writtenData || ctx.args.costData;
+    if (!asin || !costData) {{
+      util.error("Missing asin or costData in EventBridge function", "BadRequest");
+    }}
+    updates = [{{ asin, costData }}];
+  }}
+
+  const entries = updates.slice(0, 10).map(u => {{
+    if (!u.asin || !u.costData) {{
+      util.error("Batch entry missing asin or costData", "BadRequest");
+    }}
+    return {{
+      Source: "ghc25.pricing",
+      DetailType: "cost_updated",
+      EventBusName: "{event_bus_name}",
+      Detail: JSON.stringify({{
+        asin: u.asin,
+        vendorId: u.costData.vendorId,
+        cost: u.costData.cost,
+        currency: u.costData.currency,
+        timestamp: util.time.nowISO8601()
+      }})
+    }};
+  }});
+
+  return {{
+    version: "2018-05-29",
+    method: "POST",
+    resourcePath: "/",
+    params: {{
+      body: JSON.stringify({{ Entries: entries }}),
+      headers: {{
+        "content-type": "application/x-amz-json-1.1",
+        "x-amz-target": "AWSEvents.PutEvents"
+      }}
+    }}
+  }};
+}}
+
+export function response(ctx) {{
+  if (ctx.error) {{
+    console.log("EventBridge Error:", JSON.stringify(ctx.error));
+    util.error(ctx.error.message, ctx.error.type);
+  }}
+  return ctx.prev.result;
+}}
+"""
@@ -1,10 +1,34 @@
-import boto3, json
-from datetime import datetime
-def iso(): return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+import boto3, concurrent.futures, functools, json, time
+from botocore.config import Config
+
+_ISO_FMT = "%Y-%m-%dT%H:%M:%SZ"
+def iso(): return time.strftime(_ISO_FMT, time.gmtime())
+
+_CLIENT_CONFIG = Config(max_pool_connections=50, retries={"max_attempts": 10, "mode": "adaptive"})
+
+@functools.lru_cache(maxsize=1)
+def _session():
+    return boto3.session.Session()
+
+@functools.lru_cache(maxsize=None)
+def _client(service: str, region: str):
+    """Return a shared client per (service, region) so repeated calls reuse one connection pool."""
+    return _session().client(service, region_name=region, config=_CLIENT_CONFIG)
+
+def _batch_write(ddb, table_name: str, items: list):
+    """Write up to 25 items via batch_write_item, retrying UnprocessedItems with backoff."""
+    requests = [{"PutRequest": {"Item": it}} for it in items]
+    delay = 0.1
+    while requests:
+        resp = ddb.batch_write_item(RequestItems={table_name: requests})
+        requests = resp.get("UnprocessedItems", {}).get(table_name, [])
+        if requests:
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
 
 # Catalog: PK = asin
 def ensure_catalog_table(table_name: str, region: str):
-    ddb = boto3.client("dynamodb", region_name=region)
+    ddb = _client("dynamodb", region)
     try:
         return ddb.describe_table(TableName=table_name)["Table"]
     except ddb.exceptions.ResourceNotFoundException:
@@ -21,7 +45,7 @@ def ensure_catalog_table(table_name: str, region: str):
 
 # Cost: PK = asinVendor (join key "ASIN#VendorId")
 def ensure_cost_table(table_name: str, region: str):
-    ddb = boto3.client("dynamodb", region_name=region)
+    ddb = _client("dynamodb", region)
     try:
         return ddb.describe_table(TableName=table_name)["Table"]
     except ddb.exceptions.ResourceNotFoundException:
@@ -37,7 +61,7 @@ def ensure_cost_table(table_name: str, region: str):
     return ddb.describe_table(TableName=table_name)["Table"]
 
 def seed_catalog(table_name: str, region: str, asin: str):
-    ddb = boto3.client("dynamodb", region_name=region)
+    ddb = _client("dynamodb", region)
     item = {
         "asin": {"S": asin},
         "title": {"S": "Laptop 13”"},
@@ -50,18 +74,22 @@ def seed_catalog(table_name: str, region: str, asin: str):
     ddb.put_item(TableName=table_name, Item=item)
 
 def seed_cost(table_name: str, region: str, asin: str):
-    ddb = boto3.client("dynamodb", region_name=region)
+    ddb = _client("dynamodb", region)
     rows = [
         ("AcmeSupply", 865.00, "USD"),
         ("GlobalParts", 848.50, "USD"),
     ]
-    for vendor, cost, ccy in rows:
-        pk = f"{asin}#{vendor}"
-        item = {
-            "asinVendor": {"S": pk},
+    items = [
+        {
+            "asinVendor": {"S": f"{asin}#{vendor}"},
             "vendorId": {"S": vendor},
             "cost": {"N": f"{cost:.2f}"},
             "currency": {"S": ccy},
             "updatedAt": {"S": iso()},
         }
-        ddb.put_item(TableName=table_name, Item=item)
+        for vendor, cost, ccy in rows
+    ]
+    # Writes are network-bound; batch 25 items per call and run batches concurrently.
+    chunks = [items[i:i + 25] for i in range(0, len(items), 25)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as ex:
+        list(ex.map(lambda ch: _batch_write(ddb, table_name, ch), chunks))
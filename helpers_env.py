@@ -1,10 +1,14 @@
+import functools
 import os, boto3
 import re, uuid
 
+_NOT_ALLOWED = re.compile(r"[^a-z0-9-]")
+_DASHES = re.compile(r"-+")
+
 def sanitize_name(name: str) -> str:
     s = name.lower().strip().replace(" ", "-")
-    s = re.sub(r"[^a-z0-9-]", "", s)
-    s = re.sub(r"-+", "-", s).strip("-")
+    s = _NOT_ALLOWED.sub("", s)
+    s = _DASHES.sub("-", s).strip("-")
     if not s or not s[0].isalpha():
         s = "u-" + s
     return s
@@ -18,10 +22,13 @@ def build_api_name(display_name: str, suffix: str, prefix="ghc25", max_len=40):
         candidate = f"{prefix}-{base}-{suffix}"
     return candidate, base
 
+@functools.cache
 def get_region():
     return os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION")
 
+@functools.lru_cache(maxsize=4)
 def whoami(region: str):
+    # Caller identity is fixed for the process; cache so repeat calls skip the STS round-trip.
     sts = boto3.client("sts", region_name=region)
     ident = sts.get_caller_identity()
     acct, arn = ident["Account"], ident["Arn"]
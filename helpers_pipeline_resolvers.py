@@ -1,3 +1,6 @@
+_PIPELINE_REQ = "{}"
+_PIPELINE_RES = "$util.toJson($ctx.result)"
+
 def create_pipeline_resolver(client, api_id: str, type_name: str, field: str, functions: list):
     """Create a pipeline resolver with multiple functions."""
     try:
@@ -6,8 +9,8 @@ def create_pipeline_resolver(client, api_id: str, type_name: str, field: str, fu
             typeName=type_name,
             fieldName=field,
             kind="PIPELINE",
-            requestMappingTemplate="{}",
-            responseMappingTemplate="$util.toJson($ctx.result)",
+            requestMappingTemplate=_PIPELINE_REQ,
+            responseMappingTemplate=_PIPELINE_RES,
             pipelineConfig={"functions": functions}
         )
     except client.exceptions.NotFoundException:
@@ -16,40 +19,62 @@ def create_pipeline_resolver(client, api_id: str, type_name: str, field: str, fu
             typeName=type_name,
             fieldName=field,
             kind="PIPELINE",
-            requestMappingTemplate="{}",
-            responseMappingTemplate="$util.toJson($ctx.result)",
+            requestMappingTemplate=_PIPELINE_REQ,
+            responseMappingTemplate=_PIPELINE_RES,
             pipelineConfig={"functions": functions}
         )
         
+_functions_cache: dict[str, dict] = {}  # api_id -> {name: functionConfiguration}
+
+def _existing_functions(client, api_id: str):
+    """List AppSync functions once per api_id and cache them by name."""
+    if api_id not in _functions_cache:
+        fns = {}
+        for page in client.get_paginator("list_functions").paginate(apiId=api_id):
+            for f in page.get("functions", []):
+                fns[f["name"]] = f
+        _functions_cache[api_id] = fns
+    return _functions_cache[api_id]
+
 def create_function(client, api_id: str, name: str, ds_name: str, js_code: str):
     """Create or update an AppSync function."""
-    try:
-        return client.update_function(
+    # Branch on a cached listing instead of paying a failed UPDATE round-trip first.
+    fns = _existing_functions(client, api_id)
+    existing = fns.get(name)
+    if existing:
+        fn = client.update_function(
             apiId=api_id,
-            functionId=name,
+            functionId=existing["functionId"],
             name=name,
             dataSourceName=ds_name,
             runtime={"name": "APPSYNC_JS", "runtimeVersion": "1.0.0"},
             code=js_code
         )["functionConfiguration"]
-    except client.exceptions.NotFoundException:
-        return client.create_function(
+    else:
+        fn = client.create_function(
             apiId=api_id,
             name=name,
             dataSourceName=ds_name,
             runtime={"name": "APPSYNC_JS", "runtimeVersion": "1.0.0"},
             code=js_code
         )["functionConfiguration"]
+    fns[name] = fn
+    return fn
 
-def ensure_sns_ds(client, api_id: str, name: str, topic_arn: str, role_arn: str):
-    """Create or reuse an SNS data source via HTTP."""
-    ds = client.list_data_sources(apiId=api_id).get("dataSources", [])
-    for d in ds:
-        if d["name"] == name:
-            return d
+def ensure_sns_ds(client, api_id: str, name: str, topic_arn: str, role_arn: str, index=None):
+    """Create or reuse an SNS data source via HTTP (index: optional DataSourceIndex)."""
+    if index is not None:
+        existing = index.get(name)
+        if existing:
+            return existing
+    else:
+        ds = client.list_data_sources(apiId=api_id).get("dataSources", [])
+        for d in ds:
+            if d["name"] == name:
+                return d
 
     region = topic_arn.split(':')[3]
-    return client.create_data_source(
+    created = client.create_data_source(
         apiId=api_id,
         name=name,
         type="HTTP",
@@ -64,4 +89,39 @@ def ensure_sns_ds(client, api_id: str, name: str, topic_arn: str, role_arn: str)
                 }
             }
         }
-    )["dataSource"]
\ No newline at end of file
+    )["dataSource"]
+    if index is not None:
+        index.add(created)
+    return created
+
+def ensure_eventbridge_ds(client, api_id: str, name: str, region: str, role_arn: str, index=None):
+    """Create or reuse an EventBridge data source via HTTP (index: optional DataSourceIndex)."""
+    if index is not None:
+        existing = index.get(name)
+        if existing:
+            return existing
+    else:
+        ds = client.list_data_sources(apiId=api_id).get("dataSources", [])
+        for d in ds:
+            if d["name"] == name:
+                return d
+
+    created = client.create_data_source(
+        apiId=api_id,
+        name=name,
+        type="HTTP",
+        serviceRoleArn=role_arn,
+        httpConfig={
+            "endpoint": f"https://events.{region}.amazonaws.com/",
+            "authorizationConfig": {
+                "authorizationType": "AWS_IAM",
+                "awsIamConfig": {
+                    "signingRegion": region,
+                    "signingServiceName": "events"
+                }
+            }
+        }
+    )["dataSource"]
+    if index is not None:
+        index.add(created)
+    return created
\ No newline at end of file
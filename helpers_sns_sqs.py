@@ -1,62 +1,61 @@
 import boto3
+import functools
 import json
-from datetime import datetime
+import time
+from botocore.config import Config
 
-def iso(): 
-    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+_ISO_FMT = "%Y-%m-%dT%H:%M:%SZ"
+
+def iso():
+    return time.strftime(_ISO_FMT, time.gmtime())
+
+_CLIENT_CONFIG = Config(max_pool_connections=50, retries={"max_attempts": 10, "mode": "adaptive"})
+
+@functools.lru_cache(maxsize=1)
+def _session():
+    return boto3.session.Session()
+
+@functools.lru_cache(maxsize=None)
+def _client(service: str, region: str):
+    """Return a shared client per (service, region) so repeated calls reuse one connection pool."""
+    return _session().client(service, region_name=region, config=_CLIENT_CONFIG)
 
 def ensure_sns_topic(api_name: str, region: str):
     """Create SNS topic using API naming convention, return topic ARN"""
     topic_name = f"{api_name}-price-changes"
-    sns = boto3.client('sns', region_name=region)
-    try:
-        response = sns.create_topic(Name=topic_name)
-        return response['TopicArn']
-    except Exception as e:
-        if "already exists" in str(e).lower():
-            topics = sns.list_topics()['Topics']
-            return next((t['TopicArn'] for t in topics if topic_name in t['TopicArn']), None)
-        raise e
+    sns = _client('sns', region)
+    # create_topic is idempotent and returns the existing topic's ARN.
+    return sns.create_topic(Name=topic_name)['TopicArn']
 
 def ensure_sqs_queue(api_name: str, region: str):
     """Create SQS queue using API naming convention, return queue URL and ARN"""
     queue_name = f"{api_name}-price-processing"
-    sqs = boto3.client('sqs', region_name=region)
+    sqs = _client('sqs', region)
     try:
-        response = sqs.create_queue(
+        # create_queue is idempotent when the attributes match the existing queue.
+        queue_url = sqs.create_queue(
             QueueName=queue_name,
             Attributes={
                 'MessageRetentionPeriod': '1209600',  # 14 days
                 'VisibilityTimeout': '60'
             }
-        )
-        queue_url = response['QueueUrl']
-        
-        attrs = sqs.get_queue_attributes(
-            QueueUrl=queue_url,
-            AttributeNames=['QueueArn']
-        )
-        queue_arn = attrs['Attributes']['QueueArn']
-        
-        return queue_url, queue_arn
-        
-    except Exception as e:
-        if "already exists" in str(e).lower():
-            queues = sqs.list_queues(QueueNamePrefix=queue_name)
-            if 'QueueUrls' in queues and queues['QueueUrls']:
-                queue_url = queues['QueueUrls'][0]
-                attrs = sqs.get_queue_attributes(
-                    QueueUrl=queue_url,
-                    AttributeNames=['QueueArn']
-                )
-                queue_arn = attrs['Attributes']['QueueArn']
-                return queue_url, queue_arn
-        raise e
+        )['QueueUrl']
+    except sqs.exceptions.QueueNameExists:
+        # Attributes differ from an existing queue; resolve its URL directly.
+        queue_url = sqs.get_queue_url(QueueName=queue_name)['QueueUrl']
+
+    attrs = sqs.get_queue_attributes(
+        QueueUrl=queue_url,
+        AttributeNames=['QueueArn']
+    )
+    queue_arn = attrs['Attributes']['QueueArn']
+
+    return queue_url, queue_arn
 
 def setup_sns_sqs_subscription(topic_arn: str, queue_arn: str, queue_url: str, region: str):
     """Set up SQS policy and SNS subscription"""
-    sns = boto3.client('sns', region_name=region)
-    sqs = boto3.client('sqs', region_name=region)
+    sns = _client('sns', region)
+    sqs = _client('sqs', region)
     
     # Set SQS policy to allow SNS
     policy = {
@@ -88,7 +87,7 @@ def publish_price_event(topic_arn: str, api_basename: str, asin: str, vendor_id:
                        old_cost: float, new_cost: float, currency: str = "USD", 
                        reason: str = "Price update", region: str = "us-east-1"):
     """Publish a price change event to SNS"""
-    sns = boto3.client('sns', region_name=region)
+    sns = _client('sns', region)
     
     event = {
         'eventType': 'PRICE_UPDATED',
@@ -104,7 +103,7 @@ def publish_price_event(topic_arn: str, api_basename: str, asin: str, vendor_id:
     
     response = sns.publish(
         TopicArn=topic_arn,
-        Message=json.dumps(event, indent=2),
+        Message=json.dumps(event, separators=(",", ":")),
         Subject=f'Price Update - {api_basename}'
     )
     